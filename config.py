@@ -49,3 +49,11 @@ APPSTORE_COMPETITORS = [
 # ---------------------------------------------------------------------------
 BVC_BASE_URL = "https://www.bvc.com.co"
 BVC_API_URL = "https://rest.bvc.com.co"
+
+
+# ---------------------------------------------------------------------------
+# Harvest masivo de reviews de competidores (JSONL + checkpoints por app)
+# ---------------------------------------------------------------------------
+HARVEST_OUTPUT_DIR = "data/reviews"
+HARVEST_MAX_WORKERS = 4
+HARVEST_MAX_RETRIES = 3
@@ -1,17 +1,19 @@
 """
 CX-service: rating, comentarios (App/Play Store) y mercado BVC.
-Solo endpoints GET; datos en vivo por llamada.
+Solo endpoints GET. Ratings, comentarios y BVC son datos en vivo por llamada;
+/reviews/harvest escribe reviews a disco (JSONL + checkpoints entre llamadas) y retorna solo un resumen.
 """
-from fastapi import FastAPI
+from fastapi import FastAPI, Query
 from fastapi.middleware.cors import CORSMiddleware
 
-from config import TRII_CONFIG, PLAYSTORE_COMPETITORS, APPSTORE_COMPETITORS
+from config import TRII_CONFIG, PLAYSTORE_COMPETITORS, APPSTORE_COMPETITORS, HARVEST_MAX_WORKERS
 from routers.bvc import router as bvc_router
 from services.appstore import (
     get_appstore_ratings_batch,
     get_appstore_trii_rating_only,
     get_appstore_trii_comments_only,
 )
+from services.harvest import harvest_competitor_reviews
 from services.playstore import (
     get_playstore_ratings_batch,
     get_playstore_trii_rating_only,
@@ -101,6 +103,34 @@ def get_appstore_ratings() -> list:
     return get_appstore_ratings_batch(APPSTORE_COMPETITORS)
 
 
+# ---------------------------------------------------------------------------
+# Harvest masivo de reviews de competidores (streaming a JSONL, reanudable)
+# ---------------------------------------------------------------------------
+@app.get("/reviews/harvest")
+def harvest_reviews(
+    store: str = Query("all", pattern="^(all|playstore|appstore)$", description="playstore, appstore o all"),
+    lang: str = Query("es", pattern="^[a-z]{2}$", description="Idioma Play Store"),
+    country: str | None = Query(
+        None,
+        pattern="^[a-z]{2}$",
+        description="País; por defecto co (Play Store) y el de cada app (App Store)",
+    ),
+    days: int = Query(30, ge=1, description="Ventana en días hacia atrás"),
+    max_workers: int = Query(HARVEST_MAX_WORKERS, ge=1, le=16, description="Apps descargadas en paralelo"),
+) -> list:
+    """
+    Descarga reviews de todos los competidores a disco y retorna un resumen por app.
+    Bloquea hasta que terminan todas las apps (puede tardar minutos con reintentos y backoff).
+    """
+    return harvest_competitor_reviews(
+        store=store,
+        lang=lang,
+        country=country,
+        days=days,
+        max_workers=max_workers,
+    )
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -4,6 +4,11 @@ from .appstore import (
     get_appstore_trii_rating_only,
 )
 from .bvc import BVCApi, get_mercado_local, get_mercado_global
+from .harvest import (
+    harvest_appstore_app,
+    harvest_competitor_reviews,
+    harvest_playstore_app,
+)
 from .playstore import (
     get_playstore_ratings_batch,
     get_playstore_trii_comments_only,
@@ -17,6 +22,9 @@ __all__ = [
     "get_appstore_trii_rating_only",
     "get_appstore_trii_comments_only",
     "get_appstore_ratings_batch",
+    "harvest_playstore_app",
+    "harvest_appstore_app",
+    "harvest_competitor_reviews",
     "get_mercado_local",
     "get_mercado_global",
     "BVCApi",
@@ -8,6 +8,10 @@ from datetime import datetime, timedelta, timezone
 from urllib.request import urlopen
 from urllib.error import URLError, HTTPError
 
+# El RSS de Apple expone como máximo 10 páginas de 50 reviews
+RSS_PAGE_SIZE = 50
+RSS_MAX_PAGES = 10
+
 
 def get_itunes_rating(app_id: int, country: str = "co") -> tuple[float, int]:
     """
@@ -32,7 +36,7 @@ def get_itunes_rating(app_id: int, country: str = "co") -> tuple[float, int]:
 
 
 def _parse_rss_review_entry(entry: dict) -> dict | None:
-    """Extrae review de una entrada del RSS JSON. Retorna dict con date, review, userName."""
+    """Extrae review de una entrada del RSS JSON. Retorna dict con date, review, userName, rating."""
     try:
         updated = entry.get("updated")
         if isinstance(updated, dict):
@@ -54,15 +58,59 @@ def _parse_rss_review_entry(entry: dict) -> dict | None:
         name_obj = author.get("name") if isinstance(author, dict) else None
         author_name = name_obj.get("label", "") if isinstance(name_obj, dict) else str(name_obj or "")
 
+        rating_obj = entry.get("im:rating")
+        rating_str = rating_obj.get("label") if isinstance(rating_obj, dict) else rating_obj
+        rating = int(rating_str) if rating_str else None
+
         return {
             "date": dt_str,
             "review": review_text or "",
             "userName": author_name,
+            "rating": rating,
         }
     except Exception:
         return None
 
 
+def get_appstore_rss_page(app_id: int, country: str = "co", page: int = 1) -> tuple[list[dict], bool]:
+    """
+    Descarga una página del iTunes Customer Reviews RSS (más recientes primero).
+    Retorna (reviews_parseadas, hay_mas_paginas). Propaga errores de red/JSON.
+    """
+    url = f"https://itunes.apple.com/{country}/rss/customerreviews/page={page}/id={app_id}/sortby=mostrecent/json"
+    with urlopen(url, timeout=30) as resp:
+        data = json.loads(resp.read().decode())
+
+    feed = data.get("feed", {})
+    entries = feed.get("entry", [])
+    if not isinstance(entries, list):
+        entries = [entries] if entries else []
+
+    reviews: list[dict] = []
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        # Primera entrada suele ser info de la app, no review
+        if "content" not in entry and "rating" not in entry:
+            continue
+        r = _parse_rss_review_entry(entry)
+        if r is not None:
+            reviews.append(r)
+
+    return reviews, len(entries) >= RSS_PAGE_SIZE and page < RSS_MAX_PAGES
+
+
+def parse_rss_date(dt_str: str) -> datetime | None:
+    """Convierte la fecha ISO del RSS a datetime con timezone (UTC si viene naive)."""
+    try:
+        dt = datetime.fromisoformat(dt_str.replace("Z", "+00:00"))
+    except (ValueError, TypeError, AttributeError):
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
 def get_appstore_reviews_itunes_rss(app_id: int, country: str = "co") -> list[dict]:
     """
     Obtiene reviews usando iTunes Customer Reviews RSS API (sin dependencias).
@@ -72,40 +120,21 @@ def get_appstore_reviews_itunes_rss(app_id: int, country: str = "co") -> list[di
     cutoff = datetime.now(timezone.utc) - timedelta(days=30)
     all_reviews: list[dict] = []
 
-    for page in range(1, 11):
-        url = f"https://itunes.apple.com/{country}/rss/customerreviews/page={page}/id={app_id}/sortby=mostrecent/json"
+    for page in range(1, RSS_MAX_PAGES + 1):
         try:
-            with urlopen(url, timeout=30) as resp:
-                data = json.loads(resp.read().decode())
+            reviews, has_more = get_appstore_rss_page(app_id, country, page)
         except (URLError, HTTPError, json.JSONDecodeError):
             break
 
-        feed = data.get("feed", {})
-        entries = feed.get("entry", [])
-        if not isinstance(entries, list):
-            entries = [entries] if entries else []
-
-        for entry in entries:
-            if not isinstance(entry, dict):
-                continue
-            # Primera entrada suele ser info de la app, no review
-            if "content" not in entry and "rating" not in entry:
-                continue
-            r = _parse_rss_review_entry(entry)
-            if r is None:
-                continue
-            dt_str = r.get("date", "")
-            try:
-                dt = datetime.fromisoformat(dt_str.replace("Z", "+00:00"))
-            except (ValueError, TypeError):
+        for r in reviews:
+            dt = parse_rss_date(r.get("date", ""))
+            if dt is None:
                 continue
-            if dt.tzinfo is None:
-                dt = dt.replace(tzinfo=timezone.utc)
             if dt < cutoff:
                 return all_reviews
             all_reviews.append(r)
 
-        if len(entries) < 50:
+        if not has_more:
             break
 
     return all_reviews
@@ -0,0 +1,384 @@
+"""
+Servicio Harvest: recolección masiva de reviews de competidores (Play Store + App Store).
+- Paralelismo acotado entre apps (ThreadPoolExecutor con max_workers)
+- Streaming a disco: cada página se escribe en JSONL al llegar, memoria acotada a una página por app
+- Reanudable: checkpoint por app con el cursor (continuation token Play Store o página RSS App Store)
+  y el offset en bytes del JSONL; al reanudar se trunca al offset para no duplicar filas
+- Un solo harvest por app a la vez (lock de proceso + lockfile exclusivo)
+"""
+import json
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Iterator
+from urllib.error import HTTPError, URLError
+
+from google_play_scraper import Sort, reviews as gplay_reviews
+
+# Privado en google-play-scraper 1.2.7, pero es la única forma de reconstruir
+# el token guardado en el checkpoint cuando se reanuda en otro proceso.
+# Si cambia la librería, el harvest reinicia de cero en vez de fallar.
+try:
+    from google_play_scraper.features.reviews import _ContinuationToken
+except ImportError:
+    _ContinuationToken = None
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo queda el lock de proceso
+    fcntl = None
+
+from config import (
+    APPSTORE_COMPETITORS,
+    HARVEST_MAX_RETRIES,
+    HARVEST_MAX_WORKERS,
+    HARVEST_OUTPUT_DIR,
+    PLAYSTORE_COMPETITORS,
+)
+from .appstore import get_appstore_rss_page, parse_rss_date
+
+PLAYSTORE_PAGE_SIZE = 200
+# Espera base entre reintentos (se duplica en cada intento)
+RETRY_BACKOFF_SECONDS = 1.0
+
+# Locks por app (key del archivo) dentro del proceso
+_harvest_locks: dict[str, threading.Lock] = {}
+_harvest_locks_guard = threading.Lock()
+
+# fetch_page(cursor, cutoff) -> (filas, siguiente_cursor, terminado)
+FetchPage = Callable[[Any, datetime], tuple[list[dict], Any, bool]]
+
+
+class _ResumeError(Exception):
+    """El cursor del checkpoint no se puede reutilizar; hay que reiniciar el harvest."""
+
+
+class _EmptyPageError(Exception):
+    """
+    Página vacía sin cursor siguiente: error de red tragado por la librería, app sin reviews
+    para lang/país o continuation token vencido. Se reintenta y luego lo resuelve _run_harvest.
+    """
+
+
+def _is_retryable(e: Exception) -> bool:
+    """Solo errores transitorios: red, timeouts, 429/5xx, JSON truncado y página vacía. 404/4xx fallan rápido."""
+    if isinstance(e, HTTPError):
+        return e.code == 429 or e.code >= 500
+    return isinstance(
+        e, (_EmptyPageError, URLError, TimeoutError, socket.timeout, ConnectionError, json.JSONDecodeError)
+    )
+
+
+def _with_retries(fn: Callable[..., Any], retries: int, *args: Any) -> Any:
+    """Ejecuta fn(*args) reintentando errores transitorios con backoff exponencial; propaga el último error."""
+    for attempt in range(retries + 1):
+        try:
+            return fn(*args)
+        except Exception as e:
+            if attempt == retries or not _is_retryable(e):
+                raise
+            time.sleep(RETRY_BACKOFF_SECONDS * 2**attempt)
+
+
+def _load_checkpoint(path: Path) -> dict | None:
+    """Lee el checkpoint de una app. None si no existe o está corrupto."""
+    try:
+        with path.open(encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def _save_checkpoint(path: Path, checkpoint: dict) -> None:
+    """Escribe el checkpoint de forma atómica (tmp + replace) para no dejarlo a medias."""
+    tmp = path.with_suffix(".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp, path)
+
+
+@contextmanager
+def _harvest_lock(out_dir: Path, key: str) -> Iterator[bool]:
+    """
+    Lock exclusivo por app: threading.Lock dentro del proceso + flock sobre {key}.lock
+    entre procesos (se libera solo si el proceso muere). Yield False si ya está tomado.
+    """
+    with _harvest_locks_guard:
+        lock = _harvest_locks.setdefault(key, threading.Lock())
+    if not lock.acquire(blocking=False):
+        yield False
+        return
+    try:
+        out_dir.mkdir(parents=True, exist_ok=True)
+        with (out_dir / f"{key}.lock").open("w") as lockfile:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lockfile, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    yield False
+                    return
+            yield True
+    finally:
+        lock.release()
+
+
+def _open_harvest(out_dir: Path, key: str, params: dict, days: int) -> tuple[Path, Path, dict, bool]:
+    """
+    Prepara archivo JSONL y checkpoint de una app (con el lock ya tomado).
+    Si hay un checkpoint incompleto con los mismos parámetros se reanuda: el JSONL se trunca
+    al offset guardado (descarta filas escritas tras el último checkpoint) y se mantiene el corte.
+    En otro caso se empieza de cero. Retorna (jsonl, checkpoint_path, checkpoint, reanudado).
+    """
+    jsonl_path = out_dir / f"{key}.jsonl"
+    checkpoint_path = out_dir / f"{key}.checkpoint.json"
+
+    checkpoint = _load_checkpoint(checkpoint_path)
+    if (
+        checkpoint
+        and not checkpoint.get("done")
+        and checkpoint.get("params") == params
+        and "offset" in checkpoint
+        and jsonl_path.exists()
+        and jsonl_path.stat().st_size >= checkpoint["offset"]
+    ):
+        os.truncate(jsonl_path, checkpoint["offset"])
+        return jsonl_path, checkpoint_path, checkpoint, True
+
+    return jsonl_path, checkpoint_path, _reset_harvest(jsonl_path, checkpoint_path, params, days), False
+
+
+def _reset_harvest(jsonl_path: Path, checkpoint_path: Path, params: dict, days: int) -> dict:
+    """Vacía el JSONL y deja un checkpoint nuevo (cursor None, offset 0)."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    checkpoint = {
+        "params": params,
+        "cutoff": cutoff.isoformat(),
+        "cursor": None,
+        "offset": 0,
+        "written": 0,
+        "done": False,
+    }
+    jsonl_path.write_text("", encoding="utf-8")
+    _save_checkpoint(checkpoint_path, checkpoint)
+    return checkpoint
+
+
+def _write_page(jsonl_path: Path, rows: list[dict]) -> int:
+    """Agrega una página de reviews al JSONL con fsync antes de mover el checkpoint. Retorna el nuevo offset."""
+    with jsonl_path.open("a", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+        return f.tell()
+
+
+def _run_harvest(
+    summary: dict,
+    out_dir: str,
+    key: str,
+    params: dict,
+    days: int,
+    fetch_page: FetchPage,
+    retries: int,
+) -> dict:
+    """
+    Bucle común de harvest: lock, apertura/reanudación, página a página con checkpoint.
+    Si la app ya se está procesando retorna in_progress=True (con reviews/done solo si
+    el harvest en curso usa los mismos parámetros).
+    Página vacía tras agotar reintentos: con cursor leído del checkpoint se reinicia el harvest
+    (token vencido); sin cursor o con cursor obtenido en esta ejecución es el fin del feed.
+    """
+    out_path = Path(out_dir)
+    checkpoint: dict = {}
+    try:
+        with _harvest_lock(out_path, key) as acquired:
+            if not acquired:
+                running = _load_checkpoint(out_path / f"{key}.checkpoint.json") or {}
+                summary.update({"file": str(out_path / f"{key}.jsonl"), "in_progress": True})
+                if running.get("params") != params:
+                    return summary
+                checkpoint = running
+            else:
+                jsonl_path, checkpoint_path, checkpoint, resumed = _open_harvest(out_path, key, params, days)
+                summary.update({"file": str(jsonl_path), "resumed": resumed})
+                cursor_from_disk = resumed and checkpoint["cursor"] is not None
+
+                while not checkpoint["done"]:
+                    cutoff = datetime.fromisoformat(checkpoint["cutoff"])
+                    try:
+                        try:
+                            rows, next_cursor, done = _with_retries(fetch_page, retries, checkpoint["cursor"], cutoff)
+                        except _EmptyPageError as e:
+                            if cursor_from_disk:
+                                raise _ResumeError(f"el cursor guardado no devuelve reviews ({e})") from e
+                            rows, next_cursor, done = [], checkpoint["cursor"], True
+                    except _ResumeError as e:
+                        summary.update({"error": f"No se pudo reanudar, harvest reiniciado: {e}", "resumed": False})
+                        checkpoint = _reset_harvest(jsonl_path, checkpoint_path, params, days)
+                        cursor_from_disk = False
+                        continue
+                    cursor_from_disk = False
+
+                    offset = _write_page(jsonl_path, rows)
+                    updated = {
+                        **checkpoint,
+                        "offset": offset,
+                        "written": checkpoint["written"] + len(rows),
+                        "cursor": next_cursor,
+                        "done": done,
+                    }
+                    _save_checkpoint(checkpoint_path, updated)
+                    checkpoint = updated
+    except Exception as e:
+        summary["error"] = str(e)
+
+    summary["reviews"] = checkpoint.get("written", 0)
+    summary["done"] = checkpoint.get("done", False)
+    return summary
+
+
+def harvest_playstore_app(
+    item: dict,
+    lang: str = "es",
+    country: str = "co",
+    days: int = 30,
+    out_dir: str = HARVEST_OUTPUT_DIR,
+    retries: int = HARVEST_MAX_RETRIES,
+) -> dict:
+    """
+    Descarga a JSONL las reviews de una app Play Store dentro de la ventana de `days` días.
+    Orden NEWEST con corte inteligente. item: {"package_name": str, "app_name": str}
+    """
+    pkg = item.get("package_name", "")
+    app_name = item.get("app_name", pkg)
+    # Token vivo devuelto por la librería; solo se reconstruye desde el cursor al reanudar
+    live_token: list = [None]
+
+    def fetch_page(cursor: str | None, cutoff: datetime) -> tuple[list[dict], str | None, bool]:
+        token = None
+        if cursor:
+            token = live_token[0]
+            if token is None or token.token != cursor:
+                try:
+                    token = _ContinuationToken(
+                        cursor, lang, country, Sort.NEWEST.value, PLAYSTORE_PAGE_SIZE, None, None
+                    )
+                except Exception as e:
+                    raise _ResumeError(f"continuation token incompatible con google-play-scraper ({e})") from e
+
+        result, next_token = gplay_reviews(
+            pkg,
+            lang=lang,
+            country=country,
+            sort=Sort.NEWEST,
+            count=PLAYSTORE_PAGE_SIZE,
+            continuation_token=token,
+        )
+        # google-play-scraper se traga los errores de red y devuelve ([], token=None):
+        # se reintenta y _run_harvest decide si es fin del feed o cursor vencido
+        if not result and not next_token.token:
+            raise _EmptyPageError("Play Store devolvió una página vacía sin continuation token")
+        live_token[0] = next_token
+
+        rows = []
+        for r in result:
+            at = r.get("at")
+            if at is None:
+                continue
+            if at.tzinfo is None:
+                at = at.replace(tzinfo=timezone.utc)
+            if at < cutoff:
+                return rows, next_token.token, True
+            rows.append({
+                "app_name": app_name,
+                "app_id": pkg,
+                "store": "playstore",
+                "Fecha_Review": at.isoformat(),
+                "Puntuacion": r.get("score"),
+                "Comentario": r.get("content", ""),
+                "Usuario": r.get("userName"),
+            })
+        return rows, next_token.token, not next_token.token
+
+    summary: dict = {"app_name": app_name, "app_id": pkg, "store": "playstore"}
+    params = {"lang": lang, "country": country, "days": days}
+    return _run_harvest(summary, out_dir, f"playstore_{pkg}_{lang}_{country}", params, days, fetch_page, retries)
+
+
+def harvest_appstore_app(
+    item: dict,
+    country: str | None = None,
+    days: int = 30,
+    out_dir: str = HARVEST_OUTPUT_DIR,
+    retries: int = HARVEST_MAX_RETRIES,
+) -> dict:
+    """
+    Descarga a JSONL las reviews de una app App Store (RSS, máx. 10 páginas) dentro de la ventana.
+    item: {"app_id": int, "country": str, "app_name": str}. country=None usa el del item.
+    """
+    app_id = item.get("app_id")
+    app_name = item.get("app_name", str(app_id))
+    country = country or item.get("country", "co")
+    summary: dict = {"app_name": app_name, "app_id": str(app_id), "store": "appstore"}
+    if app_id is None:
+        return {**summary, "error": "app_id requerido", "reviews": 0, "done": False}
+
+    def fetch_page(cursor: int | None, cutoff: datetime) -> tuple[list[dict], int, bool]:
+        page = cursor or 1
+        reviews, has_more = get_appstore_rss_page(int(app_id), country, page)
+        rows = []
+        for r in reviews:
+            dt = parse_rss_date(r.get("date", ""))
+            if dt is None:
+                continue
+            if dt < cutoff:
+                return rows, page + 1, True
+            rows.append({
+                "app_name": app_name,
+                "app_id": str(app_id),
+                "store": "appstore",
+                "Fecha_Review": dt.isoformat(),
+                "Puntuacion": r.get("rating"),
+                "Comentario": r.get("review", ""),
+                "Usuario": r.get("userName"),
+            })
+        return rows, page + 1, not has_more
+
+    params = {"country": country, "days": days}
+    return _run_harvest(summary, out_dir, f"appstore_{app_id}_{country}", params, days, fetch_page, retries)
+
+
+def harvest_competitor_reviews(
+    store: str = "all",
+    lang: str = "es",
+    country: str | None = None,
+    days: int = 30,
+    max_workers: int = HARVEST_MAX_WORKERS,
+    out_dir: str = HARVEST_OUTPUT_DIR,
+) -> list[dict]:
+    """
+    Harvest de reviews de todos los competidores (PLAYSTORE_COMPETITORS / APPSTORE_COMPETITORS).
+    store: "playstore", "appstore" o "all". country=None usa "co" en Play Store y el país de cada app en App Store.
+    Bloquea hasta que terminan todas las apps. Retorna un resumen por app
+    (archivo, reviews escritas, done, error, in_progress); las reviews quedan en disco.
+    """
+    jobs: list[tuple[Callable[..., dict], tuple]] = []
+    if store in ("all", "playstore"):
+        jobs += [
+            (harvest_playstore_app, (item, lang, country or "co", days, out_dir))
+            for item in PLAYSTORE_COMPETITORS
+        ]
+    if store in ("all", "appstore"):
+        jobs += [(harvest_appstore_app, (item, country, days, out_dir)) for item in APPSTORE_COMPETITORS]
+    if not jobs:
+        return []
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = [executor.submit(fn, *args) for fn, args in jobs]
+        return [f.result() for f in futures]